@@ -1,65 +1,137 @@
+import atexit
+import hashlib
+import json
+import multiprocessing
 import os
+import platform
 import subprocess
-import shutil
 import time
 import re
+import shutil
 import signal
 import sys
-from datetime import datetime
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class Stats:
+    """Overall processing statistics"""
+
+    total_dirs: int = 0
+    processed_dirs: int = 0
+    total_videos: int = 0
+    processed_videos: int = 0
+    failed_videos: int = 0
+    skipped_videos: int = 0
+    renamed_videos: int = 0
+    total_original_size: int = 0  # in bytes
+    total_compressed_size: int = 0  # in bytes
+
+
+@dataclass(slots=True)
+class FolderStats:
+    """Processing statistics of a single directory"""
+
+    original_size: int = 0
+    compressed_size: int = 0
+    videos_processed: int = 0
+    videos_failed: int = 0
+    videos_found: int = 0
+    videos_skipped: int = 0
+    videos_renamed: int = 0
+    folder_time_taken: float = 0
+    completed: bool = False  # False when cut short by an interruption
+
 
 # Global variables to track state for graceful interruption
-current_video_processing = None
-current_temp_file = None
-interrupted = False
+stats = Stats()
+_INTR = threading.Event()  # Set once the user asks to stop processing
+_CURRENT_PROC = None  # FFmpeg process currently running in this process
+_WORKER_STOP = None  # Event shared with directory worker processes, if any
 total_start_time = time.time()  # Initialize total start time
 
 
 def signal_handler(sig, frame):
-    global interrupted, current_temp_file
     print("\n\nReceived interrupt signal. Cleaning up...")
-    interrupted = True
+    _INTR.set()
 
-    # Clean up current temporary file if it exists
-    if current_temp_file and os.path.exists(current_temp_file):
-        try:
-            os.remove(current_temp_file)
-            log_message(f"Cleaned up temporary file: {current_temp_file}")
-        except Exception as e:
-            log_message(f"Error cleaning up temporary file: {e}")
-
-    # Show summary before exiting
-    show_summary()
-    sys.exit(0)
+    # Stop the running FFmpeg process right away instead of after the current file
+    if _CURRENT_PROC is not None:
+        _CURRENT_PROC.terminate()
 
+    # Worker processes stop their own FFmpeg processes once they see the event
+    if _WORKER_STOP is not None:
+        _WORKER_STOP.set()
 
-# Register signal handler
-signal.signal(signal.SIGINT, signal_handler)
 
 # Setup logging
 log_file = os.path.join(
-    os.getcwd(), f"compression_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    os.getcwd(), f"compression_log_{time.strftime('%Y%m%d_%H%M%S')}.txt"
 )
 
 
+_LOG_FH = None  # Log file handle, opened on first use and kept open
+_last_log_second = None
+_last_log_timestamp = ""
+
+
+def _log_timestamp():
+    """Return the current log timestamp, formatting it at most once per second"""
+    global _last_log_second, _last_log_timestamp
+    now = int(time.time())
+    if now != _last_log_second:
+        _last_log_second = now
+        _last_log_timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    return _last_log_timestamp
+
+
+def _log_handle():
+    """Return the log file handle, opening it on first use"""
+    global _LOG_FH
+    if _LOG_FH is None:
+        _LOG_FH = open(log_file, "a", buffering=8192)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
+
+
 def log_message(message):
     """Log message to both console and log file"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = _log_timestamp()
     formatted_message = f"[{timestamp}] {message}"
     print(formatted_message)
-    with open(log_file, "a") as f:
-        f.write(formatted_message + "\n")
+    _log_handle().write(formatted_message + "\n")
+
+
+def log_block(lines):
+    """Log several lines to both console and log file as one contiguous write"""
+    timestamp = _log_timestamp()
+    block = "".join(f"[{timestamp}] {line}\n" for line in lines)
+    print(block, end="")
+    _log_handle().write(block)
+
+
+def flush_log(sync=False):
+    """Write buffered log lines to the log file, optionally forcing them to disk"""
+    if _LOG_FH is None:
+        return
+    _LOG_FH.flush()
+    if sync:
+        os.fsync(_LOG_FH.fileno())
+
+
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
 
 
 def format_size(size_bytes):
     """Convert bytes to human-readable format"""
     if size_bytes == 0:
         return "0B"
-    size_names = ["B", "KB", "MB", "GB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    return f"{size_bytes:.2f}{size_names[i]}"
+    # Each unit is 2**10 times the previous one, so the bit length picks the unit
+    i = min((size_bytes.bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (i * 10)):.2f}{SIZE_UNITS[i]}"
 
 
 def calculate_reduction(original, compressed):
@@ -70,7 +142,10 @@ def calculate_reduction(original, compressed):
 
 
 def detect_qsv_support():
-    """Detect if Intel QSV hardware acceleration is available"""
+    """
+    Detect if Intel QSV hardware acceleration is available.
+    The third value is False when the test could not give a definitive answer.
+    """
     try:
         # Test QSV with FFmpeg
         test_cmd = [
@@ -95,23 +170,26 @@ def detect_qsv_support():
             "-",
         ]
 
-        result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
+        result = subprocess.run(test_cmd, capture_output=True, timeout=10)
 
         if result.returncode == 0:
-            return True, "Intel QSV hardware acceleration available"
+            return True, "Intel QSV hardware acceleration available", True
         else:
-            return False, f"QSV test failed"
+            return False, f"QSV test failed", True
 
     except subprocess.TimeoutExpired:
-        return False, "QSV test timed out"
+        return False, "QSV test timed out", False
     except FileNotFoundError:
-        return False, "FFmpeg not found"
+        return False, "FFmpeg not found", False
     except Exception as e:
-        return False, f"Error testing QSV: {e}"
+        return False, f"Error testing QSV: {e}", False
 
 
 def detect_vaapi_support():
-    """Detect if VAAPI hardware acceleration is available using vainfo"""
+    """
+    Detect if VAAPI hardware acceleration is available using vainfo.
+    The third value is False when the check could not give a definitive answer.
+    """
     try:
         # First check if vainfo is available
         vainfo_result = subprocess.run(
@@ -119,7 +197,7 @@ def detect_vaapi_support():
         )
 
         if vainfo_result.returncode != 0:
-            return False, "vainfo not available or no VAAPI devices"
+            return False, "vainfo not available or no VAAPI devices", True
 
         # Check if H.264 encoding is supported
         vainfo_output = vainfo_result.stdout.lower()
@@ -127,16 +205,99 @@ def detect_vaapi_support():
             return (
                 True,
                 "VAAPI hardware acceleration available (H.264 encoding supported)",
+                True,
             )
         else:
-            return False, "VAAPI available but H.264 encoding not supported"
+            return False, "VAAPI available but H.264 encoding not supported", True
 
     except subprocess.TimeoutExpired:
-        return False, "vainfo test timed out"
+        return False, "vainfo test timed out", False
     except FileNotFoundError:
-        return False, "vainfo not installed"
+        # Definitive: the vainfo path is part of the hardware cache key
+        return False, "vainfo not installed", True
     except Exception as e:
-        return False, f"Error checking VAAPI: {e}"
+        return False, f"Error checking VAAPI: {e}", False
+
+
+HWACCEL_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "vid-squeeze",
+    "hwaccel.json",
+)
+
+
+def _ffmpeg_version_hash():
+    """Hash the output of `ffmpeg -version` to identify the installed FFmpeg build"""
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, timeout=5)
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    return hashlib.sha256(result.stdout).hexdigest()
+
+
+def _boot_id():
+    """Return the ID of the current boot on Linux, or None where it is unavailable"""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _is_valid_hwaccel_result(result):
+    """Check that a cached detection result has the shape returned by detect_hw_acceleration"""
+    if not isinstance(result, list) or len(result) != 4:
+        return False
+    qsv_supported, qsv_message, vaapi_supported, vaapi_message = result
+    return (
+        isinstance(qsv_supported, bool)
+        and isinstance(qsv_message, str)
+        and isinstance(vaapi_supported, bool)
+        and isinstance(vaapi_message, str)
+    )
+
+
+def detect_hw_acceleration():
+    """
+    Detect QSV and VAAPI support, reusing the result cached by a previous run
+    in the same boot with the same kernel release, FFmpeg build and vainfo install.
+    Keying on the boot means fixed drivers or group membership are picked up
+    after a reboot rather than only after a kernel update.
+    """
+    uname = platform.uname()
+    ffmpeg_hash = _ffmpeg_version_hash()
+    cache_key = [
+        uname.node,
+        uname.release,
+        _boot_id(),
+        ffmpeg_hash,
+        shutil.which("vainfo"),
+    ]
+
+    try:
+        with open(HWACCEL_CACHE_FILE) as f:
+            cached = json.load(f)
+        # Anything malformed in the cache is treated as a miss
+        if cached["key"] == cache_key and _is_valid_hwaccel_result(cached["result"]):
+            return tuple(cached["result"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    qsv_supported, qsv_message, qsv_conclusive = detect_qsv_support()
+    vaapi_supported, vaapi_message, vaapi_conclusive = detect_vaapi_support()
+    result = (qsv_supported, qsv_message, vaapi_supported, vaapi_message)
+
+    # Only cache definitive results for an FFmpeg build we could identify, so a
+    # timeout or a missing tool is re-checked on the next run
+    if ffmpeg_hash is not None and qsv_conclusive and vaapi_conclusive:
+        try:
+            os.makedirs(os.path.dirname(HWACCEL_CACHE_FILE), exist_ok=True)
+            with open(HWACCEL_CACHE_FILE, "w") as f:
+                json.dump({"key": cache_key, "result": result}, f)
+        except OSError:
+            pass
+
+    return result
 
 
 def get_cpu_count():
@@ -241,69 +402,99 @@ def get_user_encoding_preferences():
     return selected_resolution, selected_fps, selected_threads
 
 
-def build_ffmpeg_command(
-    input_path, output_path, resolution, fps, threads, hw_type="software"
-):
-    """Build FFmpeg command based on hardware acceleration type and user preferences"""
+# Input codecs that can be decoded on the GPU, mapped to their QSV decoder
+QSV_DECODERS = {
+    "h264": "h264_qsv",
+    "hevc": "hevc_qsv",
+    "mpeg2video": "mpeg2_qsv",
+    "vc1": "vc1_qsv",
+    "vp9": "vp9_qsv",
+    "av1": "av1_qsv",
+}
+VAAPI_DECODABLE_CODECS = {"h264", "hevc", "mpeg2video", "vc1", "vp8", "vp9", "av1"}
+
 
+def _hw_decoder_for(codec, hw_type):
+    """Return the hardware decoder to use for a probed input codec, or None"""
     if hw_type == "qsv":
-        # Intel QSV command (your working configuration)
-        cmd = [
-            "ffmpeg",
+        return QSV_DECODERS.get(codec)
+    if hw_type == "vaapi" and codec in VAAPI_DECODABLE_CODECS:
+        return codec
+    return None
+
+
+def _hw_device_args(hw_type):
+    """Build the global FFmpeg arguments that set up the hardware device"""
+    if hw_type == "qsv":
+        return ["-init_hw_device", "qsv=qsv", "-filter_hw_device", "qsv"]
+    elif hw_type == "vaapi":
+        return [
             "-init_hw_device",
-            "qsv=qsv",
-            "-hwaccel",
-            "qsv",
-            "-hwaccel_output_format",
-            "qsv",
-            "-i",
-            input_path,
+            "vaapi=va:/dev/dri/renderD128",
+            "-filter_hw_device",
+            "va",
         ]
+    return []
 
-        # Build video filter
-        filters = []
 
-        # Add scaling if not original resolution
-        if resolution != "original":
-            filters.append(f"scale_qsv={resolution}")
+def _build_input_args(input_path, hw_type, codec=None):
+    """Build the FFmpeg arguments for one input, returning them with the chosen decoder"""
+    decoder = None
+    args = []
 
-        # Add FPS filter if not original
-        if fps != "original":
-            filters.append(f"fps={fps}")
+    if hw_type == "qsv":
+        decoder = _hw_decoder_for(codec, hw_type)
+        if decoder:
+            # Decode on the GPU so frames never leave video memory
+            args.extend(
+                ["-hwaccel", "qsv", "-hwaccel_output_format", "qsv", "-c:v", decoder]
+            )
 
-        # Apply filters
-        if filters:
-            cmd.extend(["-vf", ",".join(filters)])
+    elif hw_type == "vaapi":
+        decoder = _hw_decoder_for(codec, hw_type)
+        if decoder:
+            # Decode on the GPU so frames never leave video memory
+            args.extend(["-hwaccel", "vaapi", "-hwaccel_output_format", "vaapi"])
 
-        cmd.extend(
-            [
-                "-c:v",
-                "h264_qsv",
-                "-preset",
-                "faster",
-                "-threads",
-                str(threads),
-                "-y",  # Overwrite output file
-                output_path,
-            ]
-        )
+    args.extend(["-i", input_path])
+    return args, decoder
 
-    elif hw_type == "vaapi":
-        # VAAPI command
-        cmd = [
-            "ffmpeg",
-            "-init_hw_device",
-            "vaapi=va:/dev/dri/renderD128",
-            "-hwaccel",
-            "vaapi",
-            "-hwaccel_output_format",
-            "vaapi",
-            "-i",
-            input_path,
+
+def _build_output_args(output_path, resolution, fps, threads, hw_type, decoder):
+    """Build the FFmpeg arguments for one output based on the encoding preferences"""
+
+    # Build video filter
+    filters = []
+
+    if hw_type == "qsv":
+        # Upload software-decoded frames to the GPU
+        if not decoder:
+            filters.append("format=nv12,hwupload=extra_hw_frames=64")
+
+        # Add scaling if not original resolution
+        if resolution != "original":
+            filters.append(f"scale_qsv={resolution}")
+
+        encoder_args = [
+            "-c:v",
+            "h264_qsv",
+            "-preset",
+            "faster",
+            "-async_depth",
+            "8",  # Keep more frames in flight in the encoder pipeline
+            "-look_ahead",
+            "0",
+            "-g",
+            str(int(fps) * 2 if fps != "original" else 60),  # 2 second GOP
+            "-threads",
+            str(threads),
         ]
 
-        # Build video filter
-        filters = []
+    elif hw_type == "vaapi":
+        # Upload software-decoded frames to the GPU. Always added, since GPU decoding
+        # can still fall back to software frames (e.g. 10-bit or 4:4:4 inputs) and
+        # hwupload passes frames that are already on the GPU through unchanged
+        filters.append("format=nv12|vaapi,hwupload")
 
         # Add scaling if not original resolution
         if resolution != "original":
@@ -311,62 +502,129 @@ def build_ffmpeg_command(
             width, height = resolution.split("x")
             filters.append(f"scale_vaapi=w={width}:h={height}")
 
-        # Add FPS filter if not original
-        if fps != "original":
-            filters.append(f"fps={fps}")
-
-        # Apply filters
-        if filters:
-            cmd.extend(["-vf", ",".join(filters)])
-
-        cmd.extend(
-            [
-                "-c:v",
-                "h264_vaapi",
-                "-qp",
-                "23",  # Quality parameter for VAAPI
-                "-y",  # Overwrite output file
-                output_path,
-            ]
-        )
+        encoder_args = [
+            "-c:v",
+            "h264_vaapi",
+            "-rc_mode",
+            "CQP",
+            "-qp",
+            "23",  # Quality parameter for VAAPI
+            "-async_depth",
+            "4",
+            "-bf",
+            "2",
+        ]
 
     else:
         # Software encoding fallback
-        cmd = ["ffmpeg", "-i", input_path]
-
-        # Build video filter
-        filters = []
-
         # Add scaling if not original resolution
         if resolution != "original":
             filters.append(f"scale={resolution}")
 
-        # Add FPS filter if not original
-        if fps != "original":
-            filters.append(f"fps={fps}")
+        encoder_args = [
+            "-filter_threads",
+            str(threads),  # Run the scale and fps filters on all threads too
+            "-c:v",
+            "libx264",
+            "-preset",
+            "faster",
+            "-crf",
+            "23",  # Quality parameter for software encoding
+            "-threads",
+            str(threads),
+            "-x264-params",
+            f"threads={threads}:lookahead_threads={max(1, threads // 2)}",
+        ]
+
+    # Add FPS filter if not original
+    if fps != "original":
+        filters.append(f"fps={fps}")
 
-        # Apply filters
-        if filters:
-            cmd.extend(["-vf", ",".join(filters)])
+    args = []
 
-        cmd.extend(
-            [
-                "-c:v",
-                "libx264",
-                "-preset",
-                "faster",
-                "-crf",
-                "23",  # Quality parameter for software encoding
-                "-threads",
-                str(threads),
-                "-y",  # Overwrite output file
-                output_path,
-            ]
+    # Apply filters
+    if filters:
+        args.extend(["-vf", ",".join(filters)])
+
+    args.extend(encoder_args)
+
+    # Put the index at the start of MP4/MOV files so playback can start right away
+    if os.path.splitext(output_path)[1].lower() in (".mp4", ".mov"):
+        args.extend(["-movflags", "+faststart"])
+
+    args.extend(["-y", output_path])  # Overwrite output file
+    return args
+
+
+def _stream_map_args(index):
+    """
+    Map the streams of one input to its output the way FFmpeg's default selection
+    does for a single input: one video stream (not cover art), one audio stream
+    and one subtitle stream, when present. Subtitles are copied since the output
+    uses the same container as the input. Reproducing the single-input default
+    also means taking global metadata and chapters from the same input, as FFmpeg
+    otherwise copies them from the first input(s) of a batch to every output.
+    """
+    return [
+        "-map_metadata",
+        str(index),
+        "-map_chapters",
+        str(index),
+        "-map",
+        f"{index}:V:0",
+        "-map",
+        f"{index}:a:0?",
+        "-map",
+        f"{index}:s:0?",
+        "-c:s",
+        "copy",
+    ]
+
+
+def build_ffmpeg_command(
+    input_path, output_path, resolution, fps, threads, hw_type="software", codec=None
+):
+    """Build FFmpeg command based on hardware acceleration type and user preferences"""
+    input_args, decoder = _build_input_args(input_path, hw_type, codec)
+    output_args = _build_output_args(
+        output_path, resolution, fps, threads, hw_type, decoder
+    )
+    return [
+        "ffmpeg",
+        "-nostats",
+        *_hw_device_args(hw_type),
+        *input_args,
+        *_stream_map_args(0),
+        *output_args,
+    ]
+
+
+def build_batch_ffmpeg_command(jobs, resolution, fps, threads, hw_type="software"):
+    """Build a single FFmpeg command that encodes several inputs to their own outputs"""
+    cmd = ["ffmpeg", "-nostats", *_hw_device_args(hw_type)]
+    output_args = []
+
+    for index, job in enumerate(jobs):
+        input_args, decoder = _build_input_args(
+            job["input_path"], hw_type, job.get("codec")
+        )
+        cmd.extend(input_args)
+
+        # Route each input's streams to its own output
+        output_args.extend(_stream_map_args(index))
+        output_args.extend(
+            _build_output_args(
+                job["temp_output_path"], resolution, fps, threads, hw_type, decoder
+            )
         )
 
+    cmd.extend(output_args)
     return cmd
 
 
+VIDEO_EXTENSIONS = frozenset([".mp4", ".mov", ".avi", ".mkv", ".flv", ".wmv", ".webm"])
+
+
 def is_video_file(filename):
     """Check if file is a video file and not a temporary file"""
     # Skip temporary files
@@ -375,15 +633,17 @@ def is_video_file(filename):
 
     # Check if file has a video extension
     ext = os.path.splitext(filename)[1].lower()
-    video_extensions = [".mp4", ".mov", ".avi", ".mkv", ".flv", ".wmv", ".webm"]
-    return ext in video_extensions
+    return ext in VIDEO_EXTENSIONS
+
+
+# Pattern to match duplicate extensions like .mp4.mp4
+_DUP_EXT_RE = re.compile(r"(\.[a-zA-Z0-9]+)(\1)$")
+_NATSORT_RE = re.compile(r"(\d+)")
 
 
 def clean_filename(filename):
     """Remove duplicate extensions from filename"""
-    # Pattern to match duplicate extensions like .mp4.mp4
-    pattern = r"(\.[a-zA-Z0-9]+)(\1)$"
-    cleaned = re.sub(pattern, r"\1", filename)
+    cleaned = _DUP_EXT_RE.sub(r"\1", filename)
 
     if cleaned != filename:
         log_message(f"    Cleaned filename: {filename} -> {cleaned}")
@@ -397,7 +657,7 @@ def natural_sort_key(s):
     Helps sort directories like "Module 1", "Module 2", "Module 10" correctly.
     """
     return [
-        int(text) if text.isdigit() else text.lower() for text in re.split(r"(\d+)", s)
+        int(text) if text.isdigit() else text.lower() for text in _NATSORT_RE.split(s)
     ]
 
 
@@ -438,262 +698,470 @@ def show_summary():
     global total_start_time  # Declare total_start_time as global
     total_time_taken = time.time() - total_start_time
 
-    log_message("=" * 80)
-    log_message("PROCESSING SUMMARY:")
-    log_message(
-        f"Directories processed: {stats['processed_dirs']}/{stats['total_dirs']}"
-    )
-    log_message(f"Videos found: {stats['total_videos']}")
-    log_message(f"Videos successfully processed: {stats['processed_videos']}")
-    log_message(f"Videos failed: {stats['failed_videos']}")
-    log_message(f"Videos skipped: {stats['skipped_videos']}")
-    log_message(f"Videos renamed: {stats['renamed_videos']}")
-    log_message(f"Total original size: {format_size(stats['total_original_size'])}")
-    log_message(f"Total compressed size: {format_size(stats['total_compressed_size'])}")
-
-    if stats["total_original_size"] > 0:
+    # Collect the summary and log it in one write
+    lines = ["=" * 80, "PROCESSING SUMMARY:"]
+    lines.append(f"Directories processed: {stats.processed_dirs}/{stats.total_dirs}")
+    lines.append(f"Videos found: {stats.total_videos}")
+    lines.append(f"Videos successfully processed: {stats.processed_videos}")
+    lines.append(f"Videos failed: {stats.failed_videos}")
+    lines.append(f"Videos skipped: {stats.skipped_videos}")
+    lines.append(f"Videos renamed: {stats.renamed_videos}")
+    lines.append(f"Total original size: {format_size(stats.total_original_size)}")
+    lines.append(f"Total compressed size: {format_size(stats.total_compressed_size)}")
+
+    if stats.total_original_size > 0:
         total_reduction = calculate_reduction(
-            stats["total_original_size"], stats["total_compressed_size"]
+            stats.total_original_size, stats.total_compressed_size
         )
-        total_saved = stats["total_original_size"] - stats["total_compressed_size"]
+        total_saved = stats.total_original_size - stats.total_compressed_size
 
         if total_saved > 0:
-            log_message(f"Total space saved: {format_size(total_saved)}")
-            log_message(f"Overall reduction: {total_reduction:.2f}%")
+            lines.append(f"Total space saved: {format_size(total_saved)}")
+            lines.append(f"Overall reduction: {total_reduction:.2f}%")
         else:
-            log_message(f"Total space increased: {format_size(-total_saved)}")
-            log_message(f"Overall increase: {-total_reduction:.2f}%")
+            lines.append(f"Total space increased: {format_size(-total_saved)}")
+            lines.append(f"Overall increase: {-total_reduction:.2f}%")
 
-    log_message(
+    lines.append(
         f"Total time taken: {time.strftime('%Hh %Mm %Ss', time.gmtime(total_time_taken))}"
     )
-    log_message(f"Detailed log saved to: {log_file}")
-    log_message("=" * 80)
+    lines.append(f"Detailed log saved to: {log_file}")
+    lines.append("=" * 80)
+    log_block(lines)
 
 
-def has_video_files(directory):
-    """Check if a directory contains any video files"""
+def scan_directories(directory, video_files, recursive=True):
+    """
+    Recursively yield every subdirectory of a directory, recording the video
+    files of each scanned directory that has any in video_files.
+    Uses os.scandir so file types come from the directory listing without a stat per file.
+    """
+    subdirectories = []
     try:
-        files = os.listdir(directory)
-        for f in files:
-            if os.path.isfile(os.path.join(directory, f)) and is_video_file(f):
-                return True
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirectories.append(entry)
+                elif entry.is_file() and is_video_file(entry.name):
+                    video_files.setdefault(directory, []).append(entry.name)
     except Exception as e:
         log_message(f"Error checking directory {directory}: {e}")
-    return False
-
-
-# Main execution starts here
-print("Video Re-encoding Script with Hardware Acceleration")
-print("=" * 60)
-
-# Detect hardware acceleration support
-qsv_supported, qsv_message = detect_qsv_support()
-vaapi_supported, vaapi_message = detect_vaapi_support()
-
-print("\nHardware Acceleration Detection:")
-print(f"Intel QSV: {'✓' if qsv_supported else '✗'} {qsv_message}")
-print(f"VAAPI: {'✓' if vaapi_supported else '✗'} {vaapi_message}")
-
-# Determine best hardware acceleration method - prioritize VAAPI as requested
-if vaapi_supported:
-    hw_acceleration = "vaapi"
-    hw_message = "Using VAAPI hardware acceleration"
-elif qsv_supported:
-    hw_acceleration = "qsv"
-    hw_message = "Using Intel QSV hardware acceleration"
-else:
-    hw_acceleration = "software"
-    hw_message = "Using software encoding (no hardware acceleration)"
-
-print(f"\n{hw_message}")
-log_message(f"Hardware acceleration: {hw_message}")
-
-# Get user encoding preferences
-target_resolution, target_fps, target_threads = get_user_encoding_preferences()
-
-# Get current directory
-current_dir = os.getcwd()
-
-# Get all subdirectories (excluding the current directory)
-all_directories = []
-for root, dirs, files in os.walk(current_dir):
-    for dir_name in dirs:
-        full_path = os.path.join(root, dir_name)
-        all_directories.append(full_path)
-
-# Check if current directory has video files
-if has_video_files(current_dir):
-    all_directories.insert(
-        0, current_dir
-    )  # Add current directory at the beginning if it has videos
-else:
-    log_message(
-        f"Current directory '{os.path.basename(current_dir)}' doesn't contain video files, skipping it."
+
+    if not recursive:
+        return
+
+    for entry in subdirectories:
+        yield entry.path
+        # Like os.walk, list symlinked directories but don't descend into them
+        yield from scan_directories(
+            entry.path, video_files, recursive=not entry.is_symlink()
+        )
+
+
+# Per-directory cache of probe results, so re-runs don't probe unchanged videos again
+PROBE_CACHE_FILE = ".vid-squeeze-cache.json"
+
+
+def probe_video(path):
+    """Return the (width, height, fps, codec) of a video's first video stream, or None"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-select_streams",
+                "v:0",
+                "-show_entries",
+                "stream=width,height,r_frame_rate,codec_name",
+                "-of",
+                "json",
+                path,
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        stream = json.loads(result.stdout)["streams"][0]
+        numerator, _, denominator = stream["r_frame_rate"].partition("/")
+        fps = float(numerator) / float(denominator or 1)
+        return stream["width"], stream["height"], fps, stream["codec_name"]
+    except (
+        subprocess.TimeoutExpired,
+        FileNotFoundError,
+        ValueError,
+        KeyError,
+        IndexError,
+        ZeroDivisionError,
+    ):
+        return None
+
+
+def is_already_compliant(probe, resolution, fps):
+    """Check if a probed video is already H.264 at or below the target resolution and FPS"""
+    width, height, video_fps, codec = probe
+    if codec != "h264":
+        return False
+    if resolution != "original":
+        target_width, target_height = map(int, resolution.split("x"))
+        if width > target_width or height > target_height:
+            return False
+    if fps != "original" and video_fps > float(fps) + 0.01:
+        return False
+    return True
+
+
+def _is_valid_probe_entry(entry):
+    """Check that a probe cache entry has the shape written by get_video_probe"""
+    if not isinstance(entry, dict):
+        return False
+    mtime, size, probe = entry.get("mtime"), entry.get("size"), entry.get("probe")
+    if not isinstance(mtime, (int, float)) or not isinstance(size, int):
+        return False
+    if not isinstance(probe, list) or len(probe) != 4:
+        return False
+    width, height, fps, codec = probe
+    return (
+        isinstance(width, int)
+        and isinstance(height, int)
+        and isinstance(fps, (int, float))
+        and isinstance(codec, str)
     )
 
-# Sort directories using natural sort (so numbered folders are in order)
-all_directories.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
 
-# Filter out directories that don't have video files
-directories_with_videos = []
-for directory in all_directories:
-    if has_video_files(directory):
-        directories_with_videos.append(directory)
-    else:
-        log_message(
-            f"Directory '{os.path.basename(directory)}' doesn't contain video files, skipping it."
+def load_probe_cache(directory):
+    """Load the probe cache of a directory, ignoring anything malformed in it"""
+    try:
+        with open(os.path.join(directory, PROBE_CACHE_FILE)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # The file lives in user folders, so treat unexpected contents as cache misses
+    if not isinstance(cached, dict):
+        return {}
+    return {
+        name: entry for name, entry in cached.items() if _is_valid_probe_entry(entry)
+    }
+
+
+def save_probe_cache(directory, probe_cache):
+    """Save the probe cache of a directory"""
+    try:
+        with open(os.path.join(directory, PROBE_CACHE_FILE), "w") as f:
+            json.dump(probe_cache, f)
+    except OSError as e:
+        log_message(f"Error saving probe cache for {directory}: {e}")
+
+
+def get_video_probe(input_path, file_stat, probe_cache):
+    """Probe a video, reusing the cached result while its mtime and size are unchanged"""
+    name = os.path.basename(input_path)
+    entry = probe_cache.get(name)
+    if (
+        entry
+        and entry["mtime"] == file_stat.st_mtime
+        and entry["size"] == file_stat.st_size
+    ):
+        return entry["probe"]
+
+    probe = probe_video(input_path)
+    if probe is not None:
+        probe_cache[name] = {
+            "mtime": file_stat.st_mtime,
+            "size": file_stat.st_size,
+            "probe": list(probe),
+        }
+    return probe
+
+
+# Number of videos encoded together by a single FFmpeg process on the hardware
+# paths. Software encodes run one video per process so that the selected thread
+# count stays the CPU budget; they are parallelized across directories instead.
+BATCH_SIZE = 4
+
+# Number of FFmpeg stderr lines kept for error reporting
+STDERR_TAIL_LINES = 200
+
+# Seconds FFmpeg gets to exit after an interrupt before it is killed
+FFMPEG_STOP_TIMEOUT = 2
+
+
+def _stop_process(process):
+    """Terminate a process, killing it if it doesn't exit in time"""
+    process.terminate()
+    try:
+        process.wait(timeout=FFMPEG_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_ffmpeg(cmd):
+    """
+    Run an FFmpeg command, streaming its stderr and keeping only the last lines.
+    Raises subprocess.CalledProcessError with those lines as stderr on failure.
+    The command is stopped as soon as processing is interrupted.
+    """
+    global _CURRENT_PROC
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        bufsize=65536,
+    ) as process:
+        _CURRENT_PROC = process
+        reader = threading.Thread(
+            target=stderr_tail.extend, args=(process.stderr,), daemon=True
+        )
+        reader.start()
+        try:
+            while True:
+                try:
+                    returncode = process.wait(timeout=0.1)
+                    break
+                except subprocess.TimeoutExpired:
+                    if _INTR.is_set():
+                        _stop_process(process)
+        except BaseException:
+            # Don't leave FFmpeg encoding in the background
+            process.kill()
+            raise
+        finally:
+            _CURRENT_PROC = None
+        reader.join()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, cmd, stderr=b"".join(stderr_tail)
         )
 
-# Ask user for starting directory
-if directories_with_videos:
-    start_index = get_user_start_index(directories_with_videos)
-    directories_to_process = directories_with_videos[start_index:]
-else:
-    log_message("No directories with video files found. Exiting.")
-    sys.exit(0)
-
-log_message(f"Video compression process started")
-log_message(f"Hardware acceleration: {hw_acceleration.upper()}")
-log_message(f"Target resolution: {target_resolution}")
-log_message(f"Target FPS: {target_fps}")
-log_message(f"Threads: {target_threads}")
-log_message(
-    f"Found {len(directories_with_videos)} directories with video files to process"
-)
-log_message(
-    f"Starting from directory {start_index}: {os.path.basename(directories_with_videos[start_index])}"
-)
-log_message("Directory processing order:")
-for i, directory in enumerate(directories_to_process, start_index):
-    log_message(f"  {i}. {os.path.basename(directory)}")
-log_message("=" * 80)
-
-# Track processing statistics
-stats = {
-    "total_dirs": len(directories_with_videos),
-    "processed_dirs": 0,
-    "total_videos": 0,
-    "processed_videos": 0,
-    "failed_videos": 0,
-    "skipped_videos": 0,
-    "renamed_videos": 0,
-    "total_original_size": 0,  # in bytes
-    "total_compressed_size": 0,  # in bytes
-}
 
-# Process each directory in sorted order
-for directory in directories_to_process:
-    if interrupted:
-        break
+def run_batch(jobs, resolution, fps, threads, hw_type):
+    """
+    Encode a batch of videos with a single FFmpeg process.
+    If the batch fails, each video is retried with its own FFmpeg process so one
+    bad file doesn't fail the others. Returns the errors of videos that failed,
+    with None as the error of videos whose conversion was interrupted.
+    """
+    if len(jobs) > 1:
+        cmd = build_batch_ffmpeg_command(jobs, resolution, fps, threads, hw_type)
+        try:
+            run_ffmpeg(cmd)
+            return {}
+        except subprocess.CalledProcessError:
+            if _INTR.is_set():
+                return {job["video"]: None for job in jobs}
+            log_message("    Batch conversion failed, retrying videos one at a time")
+            for job in jobs:
+                if os.path.exists(job["temp_output_path"]):
+                    os.remove(job["temp_output_path"])
+
+    errors = {}
+    for job in jobs:
+        if _INTR.is_set():
+            errors[job["video"]] = None
+            continue
+
+        cmd = build_ffmpeg_command(
+            job["input_path"],
+            job["temp_output_path"],
+            resolution,
+            fps,
+            threads,
+            hw_type,
+            job.get("codec"),
+        )
+        try:
+            run_ffmpeg(cmd)
+        except subprocess.CalledProcessError as e:
+            if _INTR.is_set():
+                errors[job["video"]] = None
+            else:
+                errors[job["video"]] = (
+                    e.stderr.decode("utf-8", errors="replace")
+                    if e.stderr
+                    else "Unknown error"
+                )
+    return errors
+
+
+def process_directory(
+    directory,
+    videos,
+    dir_number,
+    total_dirs,
+    resolution,
+    fps,
+    threads,
+    hw_type="software",
+):
+    """Re-encode the given videos of a directory and return the folder statistics"""
+    if _INTR.is_set():
+        return None
 
     folder_start_time = time.time()  # Start time for current directory
 
     # Track folder-level statistics
-    folder_stats = {
-        "original_size": 0,
-        "compressed_size": 0,
-        "videos_processed": 0,
-        "videos_failed": 0,
-        "folder_time_taken": 0,  # Add folder time taken
-    }
+    folder_stats = FolderStats()
 
     log_message(
-        f"Processing directory ({stats['processed_dirs'] + 1}/{stats['total_dirs']}): {os.path.basename(directory)}"
+        f"Processing directory ({dir_number}/{total_dirs}): {os.path.basename(directory)}"
     )
     log_message(f"Full path: {directory}")
 
-    # List video files in this directory using our custom function
-    videos = [
-        f
-        for f in os.listdir(directory)
-        if os.path.isfile(os.path.join(directory, f)) and is_video_file(f)
-    ]
-
     # Sort videos using natural sort as well
     videos.sort(key=natural_sort_key)
 
     if not videos:
         log_message("No video files found in this directory")
-        stats["processed_dirs"] += 1
-        continue
+        folder_stats.completed = True
+        return folder_stats
 
-    stats["total_videos"] += len(videos)
+    folder_stats.videos_found = len(videos)
     log_message(f"Found {len(videos)} video(s) to process in this directory")
 
-    # Process each video in the directory
-    for i, video in enumerate(videos, 1):
-        if interrupted:
+    # Only skip compliant videos when there is a target to comply with
+    check_compliance = resolution != "original" or fps != "original"
+    # The hardware paths also need the input codec to pick a GPU decoder
+    use_probe = check_compliance or hw_type != "software"
+    probe_cache = load_probe_cache(directory) if use_probe else {}
+
+    # Process the videos in batches, each encoded by a single FFmpeg process
+    batch_size = BATCH_SIZE if hw_type != "software" else 1
+    interrupted = False
+    for batch_start in range(0, len(videos), batch_size):
+        if _INTR.is_set():
+            interrupted = True
             break
 
-        video_start_time = time.time()  # Start time for current video
-
-        input_path = os.path.join(directory, video)
+        batch_start_time = time.time()  # Start time for current batch
 
-        # Clean the filename to remove duplicate extensions
-        cleaned_video = clean_filename(video)
-        final_output_name = cleaned_video
+        # Prepare each video in the batch
+        jobs = []
+        for i, video in enumerate(
+            videos[batch_start : batch_start + batch_size], batch_start + 1
+        ):
+            input_path = os.path.join(directory, video)
 
-        # Create a safe temporary filename
-        temp_output_path = os.path.join(
-            directory, f"temp_{cleaned_video.replace(' ', '_')}"
-        )
+            # Clean the filename to remove duplicate extensions
+            cleaned_video = clean_filename(video)
+            final_output_name = cleaned_video
 
-        # Update global variables for interruption handling
-        current_video_processing = video
-        current_temp_file = temp_output_path
+            # Create a safe temporary filename, numbered so that videos whose names
+            # only differ by spaces/underscores never share one within a batch
+            temp_output_path = os.path.join(
+                directory, f"temp_{i}_{cleaned_video.replace(' ', '_')}"
+            )
 
-        # Check if file still exists before processing
-        if not os.path.exists(input_path):
-            log_message(
-                f"  ⚠ Skipping video {i}/{len(videos)}: {video} (file no longer exists)"
+            # Check if file is still accessible before processing and get its size
+            try:
+                file_stat = os.stat(input_path)
+            except FileNotFoundError:
+                log_message(
+                    f"  ⚠ Skipping video {i}/{len(videos)}: {video} (file no longer exists)"
+                )
+                folder_stats.videos_skipped += 1
+                continue
+            except OSError as e:
+                log_message(f"  ⚠ Skipping video {i}/{len(videos)}: {video} ({e})")
+                folder_stats.videos_skipped += 1
+                continue
+            original_size = file_stat.st_size
+
+            # A single probe serves both the compliance check and the decoder choice
+            probe = (
+                get_video_probe(input_path, file_stat, probe_cache)
+                if use_probe
+                else None
             )
-            stats["skipped_videos"] += 1
-            continue
 
-        try:
-            # Get original file size
-            original_size = os.path.getsize(input_path)
-            stats["total_original_size"] += original_size
-            folder_stats["original_size"] += original_size
+            # Re-encoding a video that already matches the targets only loses quality
+            # (videos that still need renaming go through the normal conversion)
+            if check_compliance and video == cleaned_video and probe is not None:
+                if is_already_compliant(probe, resolution, fps):
+                    log_message(
+                        f"  ✓ Skipping video {i}/{len(videos)}: {video} (already compliant)"
+                    )
+                    folder_stats.videos_skipped += 1
+                    continue
+
+            folder_stats.original_size += original_size
 
             log_message(f"  Converting video {i}/{len(videos)}: {video}")
             if video != cleaned_video:
                 log_message(f"    Will rename to: {cleaned_video}")
-                stats["renamed_videos"] += 1
+                folder_stats.videos_renamed += 1
             log_message(f"    Original size: {format_size(original_size)}")
 
-            # Build FFmpeg command
-            cmd = build_ffmpeg_command(
-                input_path,
-                temp_output_path,
-                target_resolution,
-                target_fps,
-                target_threads,
-                hw_acceleration,
+            jobs.append(
+                {
+                    "video": video,
+                    "input_path": input_path,
+                    "temp_output_path": temp_output_path,
+                    "final_output_name": final_output_name,
+                    "original_size": original_size,
+                    "codec": probe[3] if probe is not None else None,
+                }
             )
 
-            # Run conversion
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        if not jobs:
+            continue
 
-            # If conversion successful, replace original
-            if os.path.exists(temp_output_path):
-                # Get compressed file size
-                compressed_size = os.path.getsize(temp_output_path)
-                stats["total_compressed_size"] += compressed_size
-                folder_stats["compressed_size"] += compressed_size
+        # Run conversion
+        try:
+            errors = run_batch(jobs, resolution, fps, threads, hw_type)
+        except Exception as e:
+            errors = {job["video"]: f"Unexpected error: {e}" for job in jobs}
+
+        for job in jobs:
+            video = job["video"]
+            input_path = job["input_path"]
+            temp_output_path = job["temp_output_path"]
+            final_output_name = job["final_output_name"]
+            original_size = job["original_size"]
+
+            try:
+                if video in errors:
+                    if errors[video] is None:
+                        # Don't count an unfinished conversion as a failure
+                        log_message(f"    ⚠ Interrupted while converting: {video}")
+                        interrupted = True
+                        folder_stats.videos_skipped += 1
+                        folder_stats.original_size -= original_size
+                    else:
+                        log_message(f"    ✗ Error converting {video}: {errors[video]}")
+                        folder_stats.videos_failed += 1
+                    # Clean up temporary file if it exists
+                    if os.path.exists(temp_output_path):
+                        os.remove(temp_output_path)
+                    continue
+
+                # If conversion successful, replace original
+                try:
+                    # Get compressed file size
+                    compressed_size = os.stat(temp_output_path).st_size
+                except FileNotFoundError:
+                    log_message(f"    ✗ Conversion failed (output missing): {video}")
+                    folder_stats.videos_failed += 1
+                    continue
+
+                folder_stats.compressed_size += compressed_size
 
                 # Calculate savings
                 reduction = calculate_reduction(original_size, compressed_size)
 
-                # Remove original
-                os.remove(input_path)
-
                 # Determine final output path
                 final_output_path = os.path.join(directory, final_output_name)
 
-                # Rename temp to final name
-                shutil.move(temp_output_path, final_output_path)
+                # Atomically rename temp to final name, replacing the original
+                # when the names match so it is never missing mid-way
+                os.replace(temp_output_path, final_output_path)
+
+                # Remove original if it was saved under a different name
+                if final_output_path != input_path:
+                    os.remove(input_path)
 
                 log_message(f"    ✓ Successfully converted: {video}")
                 if video != final_output_name:
@@ -709,79 +1177,261 @@ for directory in directories_to_process:
                         f"    Increase: {-reduction:.2f}% (added {format_size(compressed_size - original_size)})"
                     )
 
-                stats["processed_videos"] += 1
-                folder_stats["videos_processed"] += 1
-            else:
-                log_message(f"    ✗ Conversion failed (output missing): {video}")
-                stats["failed_videos"] += 1
-                folder_stats["videos_failed"] += 1
+                folder_stats.videos_processed += 1
 
-        except subprocess.CalledProcessError as e:
-            log_message(
-                f"    ✗ Error converting {video}: {e.stderr if e.stderr else 'Unknown error'}"
-            )
-            stats["failed_videos"] += 1
-            folder_stats["videos_failed"] += 1
-            # Clean up temporary file if it exists
-            if os.path.exists(temp_output_path):
-                os.remove(temp_output_path)
-        except FileNotFoundError as e:
-            log_message(f"    ⚠ File not found during processing: {video} - {e}")
-            stats["skipped_videos"] += 1
-        except Exception as e:
-            log_message(f"    ⚠ Unexpected error processing {video}: {e}")
-            stats["failed_videos"] += 1
-            folder_stats["videos_failed"] += 1
-            # Clean up temporary file if it exists
-            if os.path.exists(temp_output_path):
-                os.remove(temp_output_path)
-
-        # Reset current processing variables
-        current_video_processing = None
-        current_temp_file = None
-
-        video_end_time = time.time()
-        video_time_taken = video_end_time - video_start_time
+            except FileNotFoundError as e:
+                log_message(f"    ⚠ File not found during processing: {video} - {e}")
+                folder_stats.videos_skipped += 1
+            except Exception as e:
+                log_message(f"    ⚠ Unexpected error processing {video}: {e}")
+                folder_stats.videos_failed += 1
+                # Clean up temporary file if it exists
+                if os.path.exists(temp_output_path):
+                    os.remove(temp_output_path)
+
+        batch_end_time = time.time()
+        batch_time_taken = batch_end_time - batch_start_time
         log_message(
-            f"    Time taken for video: {time.strftime('%Hh %Mm %Ss', time.gmtime(video_time_taken))}"
+            f"    Time taken for batch: {time.strftime('%Hh %Mm %Ss', time.gmtime(batch_time_taken))}"
         )
 
-    # Show folder-level summary
-    if folder_stats["original_size"] > 0:
-        folder_reduction = calculate_reduction(
-            folder_stats["original_size"], folder_stats["compressed_size"]
+    if use_probe:
+        # Keep only entries for the videos that are still in the directory
+        save_probe_cache(
+            directory,
+            {name: entry for name, entry in probe_cache.items() if name in videos},
         )
-        folder_saved = folder_stats["original_size"] - folder_stats["compressed_size"]
 
-        log_message(f"Folder '{os.path.basename(directory)}' summary:")
-        log_message(f"  Videos processed: {folder_stats['videos_processed']}")
-        log_message(f"  Videos failed: {folder_stats['videos_failed']}")
-        log_message(f"  Original size: {format_size(folder_stats['original_size'])}")
-        log_message(
-            f"  Compressed size: {format_size(folder_stats['compressed_size'])}"
+    # Show folder-level summary, collected and logged in one write
+    lines = []
+    if folder_stats.original_size > 0:
+        folder_reduction = calculate_reduction(
+            folder_stats.original_size, folder_stats.compressed_size
         )
+        folder_saved = folder_stats.original_size - folder_stats.compressed_size
+
+        lines.append(f"Folder '{os.path.basename(directory)}' summary:")
+        lines.append(f"  Videos processed: {folder_stats.videos_processed}")
+        lines.append(f"  Videos failed: {folder_stats.videos_failed}")
+        lines.append(f"  Original size: {format_size(folder_stats.original_size)}")
+        lines.append(f"  Compressed size: {format_size(folder_stats.compressed_size)}")
 
         if folder_saved > 0:
-            log_message(f"  Space saved: {format_size(folder_saved)}")
-            log_message(f"  Reduction: {folder_reduction:.2f}%")
+            lines.append(f"  Space saved: {format_size(folder_saved)}")
+            lines.append(f"  Reduction: {folder_reduction:.2f}%")
         else:
-            log_message(f"  Space increased: {format_size(-folder_saved)}")
-            log_message(f"  Increase: {-folder_reduction:.2f}%")
+            lines.append(f"  Space increased: {format_size(-folder_saved)}")
+            lines.append(f"  Increase: {-folder_reduction:.2f}%")
 
     folder_end_time = time.time()
-    folder_stats["folder_time_taken"] = folder_end_time - folder_start_time
+    folder_stats.folder_time_taken = folder_end_time - folder_start_time
+    lines.append(
+        f"  Time taken for directory: {time.strftime('%Hh %Mm %Ss', time.gmtime(folder_stats.folder_time_taken))}"
+    )
+
+    folder_stats.completed = not interrupted
+    if interrupted:
+        lines.append(f"Interrupted processing directory: {os.path.basename(directory)}")
+    else:
+        lines.append(f"Finished processing directory: {os.path.basename(directory)}")
+    lines.append("-" * 80)
+    log_block(lines)
+
+    # Worker processes exit without running atexit handlers
+    flush_log()
+    return folder_stats
+
+
+def merge_folder_stats(folder_stats):
+    """Add the statistics of a processed directory to the overall statistics"""
+    stats.total_videos += folder_stats.videos_found
+    stats.processed_videos += folder_stats.videos_processed
+    stats.failed_videos += folder_stats.videos_failed
+    stats.skipped_videos += folder_stats.videos_skipped
+    stats.renamed_videos += folder_stats.videos_renamed
+    stats.total_original_size += folder_stats.original_size
+    stats.total_compressed_size += folder_stats.compressed_size
+    if folder_stats.completed:
+        stats.processed_dirs += 1
+
+
+def _init_worker(main_log_file, stop_event):
+    """Set up a worker process so it logs to the main log file and stops with the main process"""
+    global log_file, _LOG_FH, _INTR
+    log_file = main_log_file
+    _LOG_FH = None  # Open a handle of its own instead of sharing the parent's
+    # Ctrl+C is handled by the main process, which sets the shared stop event
+    _INTR = stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def main():
+    global stats, _WORKER_STOP
+
+    print("Video Re-encoding Script with Hardware Acceleration")
+    print("=" * 60)
+
+    # Detect hardware acceleration support
+    qsv_supported, qsv_message, vaapi_supported, vaapi_message = (
+        detect_hw_acceleration()
+    )
+
+    print("\nHardware Acceleration Detection:")
+    print(f"Intel QSV: {'✓' if qsv_supported else '✗'} {qsv_message}")
+    print(f"VAAPI: {'✓' if vaapi_supported else '✗'} {vaapi_message}")
+
+    # Determine best hardware acceleration method - prioritize VAAPI as requested
+    if vaapi_supported:
+        hw_acceleration = "vaapi"
+        hw_message = "Using VAAPI hardware acceleration"
+    elif qsv_supported:
+        hw_acceleration = "qsv"
+        hw_message = "Using Intel QSV hardware acceleration"
+    else:
+        hw_acceleration = "software"
+        hw_message = "Using software encoding (no hardware acceleration)"
+
+    print(f"\n{hw_message}")
+    log_message(f"Hardware acceleration: {hw_message}")
+
+    # Get user encoding preferences
+    target_resolution, target_fps, target_threads = get_user_encoding_preferences()
+
+    # Get current directory
+    current_dir = os.getcwd()
+
+    # Get all subdirectories (excluding the current directory), noting which have videos
+    video_files = {}
+    all_directories = list(scan_directories(current_dir, video_files))
+
+    # Check if current directory has video files
+    if current_dir in video_files:
+        all_directories.insert(
+            0, current_dir
+        )  # Add current directory at the beginning if it has videos
+    else:
+        log_message(
+            f"Current directory '{os.path.basename(current_dir)}' doesn't contain video files, skipping it."
+        )
+
+    # Sort directories using natural sort (so numbered folders are in order)
+    all_directories.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
+
+    # Filter out directories that don't have video files
+    directories_with_videos = []
+    for directory in all_directories:
+        if directory in video_files:
+            directories_with_videos.append(directory)
+        else:
+            log_message(
+                f"Directory '{os.path.basename(directory)}' doesn't contain video files, skipping it."
+            )
+
+    # Ask user for starting directory
+    if directories_with_videos:
+        start_index = get_user_start_index(directories_with_videos)
+        directories_to_process = directories_with_videos[start_index:]
+    else:
+        log_message("No directories with video files found. Exiting.")
+        sys.exit(0)
+
+    log_message(f"Video compression process started")
+    log_message(f"Hardware acceleration: {hw_acceleration.upper()}")
+    log_message(f"Target resolution: {target_resolution}")
+    log_message(f"Target FPS: {target_fps}")
+    log_message(f"Threads: {target_threads}")
+    log_message(
+        f"Found {len(directories_with_videos)} directories with video files to process"
+    )
     log_message(
-        f"  Time taken for directory: {time.strftime('%Hh %Mm %Ss', time.gmtime(folder_stats['folder_time_taken']))}"
+        f"Starting from directory {start_index}: {os.path.basename(directories_with_videos[start_index])}"
     )
+    log_message("Directory processing order:")
+    for i, directory in enumerate(directories_to_process, start_index):
+        log_message(f"  {i}. {os.path.basename(directory)}")
+    log_message("=" * 80)
+
+    # Track processing statistics
+    stats = Stats(total_dirs=len(directories_with_videos))
+
+    # Software encoding scales with the number of FFmpeg processes, while hardware
+    # encoders share a single GPU, so only parallelize directories in software mode
+    if hw_acceleration == "software":
+        max_workers = max(1, get_cpu_count() // target_threads)
+    else:
+        max_workers = 1
+    max_workers = min(max_workers, len(directories_to_process))
+
+    # Stop cleanly on Ctrl+C from here on
+    signal.signal(signal.SIGINT, signal_handler)
+
+    # Process each directory in sorted order
+    if max_workers == 1:
+        for dir_number, directory in enumerate(directories_to_process, start_index + 1):
+            if _INTR.is_set():
+                break
+
+            folder_stats = process_directory(
+                directory,
+                video_files.pop(directory),
+                dir_number,
+                stats.total_dirs,
+                target_resolution,
+                target_fps,
+                target_threads,
+                hw_acceleration,
+            )
+            if folder_stats is None:
+                break
+            merge_folder_stats(folder_stats)
+    else:
+        log_message(f"Processing {max_workers} directories in parallel")
+        flush_log()  # Don't let forked workers inherit unwritten log lines
+        _WORKER_STOP = multiprocessing.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(log_file, _WORKER_STOP),
+        )
+        futures = [
+            pool.submit(
+                process_directory,
+                directory,
+                video_files.pop(directory),
+                dir_number,
+                stats.total_dirs,
+                target_resolution,
+                target_fps,
+                target_threads,
+                hw_acceleration,
+            )
+            for dir_number, directory in enumerate(
+                directories_to_process, start_index + 1
+            )
+        ]
+        try:
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                folder_stats = future.result()
+                if folder_stats is None:
+                    continue
+                merge_folder_stats(folder_stats)
+                if _INTR.is_set():
+                    for pending in futures:
+                        pending.cancel()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    # Show final summary
+    show_summary()
 
-    stats["processed_dirs"] += 1
-    log_message(f"Finished processing directory: {os.path.basename(directory)}")
-    log_message("-" * 80)
+    # Reset terminal if we were interrupted
+    if _INTR.is_set():
+        flush_log(sync=True)
+        print("\nProcessing interrupted by user. Summary displayed above.")
+        print(f"Detailed log saved to: {log_file}")
 
-# Show final summary
-show_summary()
 
-# Reset terminal if we were interrupted
-if interrupted:
-    print("\nProcessing interrupted by user. Summary displayed above.")
-    print(f"Detailed log saved to: {log_file}")
+if __name__ == "__main__":
+    main()